@@ -0,0 +1,88 @@
+# backend/cache.py
+# Small in-process caches for per-user results
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Optional
+
+class TTLCache:
+    """Simple time-based cache for small per-user payloads."""
+    
+    def __init__(self, ttl_seconds: int):
+        self.entries = {}  # In production, use Redis
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._lock = Lock()  # Sync handlers run in the threadpool
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            
+            value, expires_at = entry
+            if datetime.utcnow() >= expires_at:
+                del self.entries[key]
+                return None
+            
+            return value
+    
+    def set(self, key: str, value: Any):
+        """Store a value for the configured TTL."""
+        with self._lock:
+            self.entries[key] = (value, datetime.utcnow() + self.ttl)
+    
+    def delete(self, key: str):
+        """Invalidate a cached value."""
+        with self._lock:
+            self.entries.pop(key, None)
+    
+    def delete_prefix(self, prefix: str):
+        """Invalidate every cached value whose key starts with prefix."""
+        with self._lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                del self.entries[key]
+
+class LRUCache:
+    """Size-bounded cache that evicts the least recently used entry."""
+    
+    def __init__(self, maxsize: int):
+        self.entries = OrderedDict()  # In production, use Redis
+        self.maxsize = maxsize
+        self._lock = Lock()
+    
+    def get(self, key: Any) -> Optional[Any]:
+        """Return the cached value, or None if missing."""
+        with self._lock:
+            if key not in self.entries:
+                return None
+            
+            self.entries.move_to_end(key)
+            return self.entries[key]
+    
+    def set(self, key: Any, value: Any):
+        """Store a value, evicting the oldest entry when full."""
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+    
+    def delete(self, key: Any):
+        """Invalidate a cached value."""
+        with self._lock:
+            self.entries.pop(key, None)
+
+# Last duplicate scan per user - matches the 1 hour "recent scan" window
+duplicate_scan_cache = TTLCache(ttl_seconds=3600)
+
+# Duplicate statistics per user - short enough for a dashboard refresh
+duplicate_stats_cache = TTLCache(ttl_seconds=60)
+
+# Transaction summaries per user and date range - dropped on every write
+transaction_summary_cache = TTLCache(ttl_seconds=300)
+
+# Raw uploads by (user_id, content_hash) - raw files are immutable, so
+# entries never go stale
+raw_file_cache = LRUCache(maxsize=10000)
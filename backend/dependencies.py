@@ -4,7 +4,7 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional
 
 from . import models, auth
@@ -12,6 +12,10 @@ from . import models, auth
 # Security
 security = HTTPBearer()
 
+# last_login only needs minute-level accuracy - skip the write (and its
+# commit) when it was refreshed recently
+LAST_LOGIN_UPDATE_INTERVAL = timedelta(minutes=5)
+
 # ===== DATABASE DEPENDENCY =====
 def get_db():
     """Database session dependency."""
@@ -22,7 +26,9 @@ def get_db():
         db.close()
 
 # ===== AUTHENTICATION DEPENDENCIES =====
-async def get_current_user(
+# Plain def so the user lookup and last_login commit run in the threadpool
+# instead of blocking the event loop on every authenticated request
+def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
 ) -> models.User:
@@ -49,12 +55,14 @@ async def get_current_user(
         )
     
     # Update last login
-    user.last_login = datetime.utcnow()
-    db.commit()
+    now = datetime.utcnow()
+    if user.last_login is None or now - user.last_login >= LAST_LOGIN_UPDATE_INTERVAL:
+        user.last_login = now
+        db.commit()
     
     return user
 
-async def get_current_user_optional(
+def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db)
 ) -> Optional[models.User]:
@@ -63,7 +71,7 @@ async def get_current_user_optional(
         return None
     
     try:
-        return await get_current_user(credentials, db)
+        return get_current_user(credentials, db)
     except HTTPException:
         return None
 
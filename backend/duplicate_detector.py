@@ -3,7 +3,8 @@
 
 import re
 from typing import Dict, List, Optional, Tuple, Any
-from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, load_only
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 from collections import defaultdict
@@ -36,8 +37,16 @@ class DuplicateDetector:
         """Find all duplicate transactions using multiple detection methods."""
         
         try:
-            # Get all transactions for the user
-            transactions = self.db.query(models.Transaction).filter(
+            # Get all transactions for the user - only the columns the
+            # detection methods compare
+            transactions = self.db.query(models.Transaction).options(
+                load_only(
+                    models.Transaction.id,
+                    models.Transaction.transaction_date,
+                    models.Transaction.beneficiary,
+                    models.Transaction.amount
+                )
+            ).filter(
                 models.Transaction.owner_id == self.user_id
             ).order_by(models.Transaction.transaction_date.desc()).all()
             
@@ -60,44 +69,44 @@ class DuplicateDetector:
                 fuzzy_groups = self._find_fuzzy_duplicates(transactions, processed_transactions)
                 all_duplicate_groups.extend(fuzzy_groups)
             
-            # Create duplicate groups in database (simplified)
-            created_groups = []
-            for group_data in all_duplicate_groups:
-                try:
-                    # Create or find duplicate group
-                    duplicate_group = models.DuplicateGroup(
-                        detection_method=group_data["method"],
-                        confidence_score=group_data["confidence"],
-                        user_id=self.user_id,
-                        status=models.DuplicateStatus.PENDING
-                    )
-                    
-                    self.db.add(duplicate_group)
-                    self.db.flush()  # Get ID without committing
-                    
-                    # Add entries
-                    entries = []
-                    for i, transaction_id in enumerate(group_data["transaction_ids"]):
-                        entry = models.DuplicateEntry(
-                            group_id=duplicate_group.id,
-                            transaction_id=transaction_id,
-                            is_primary=(i == 0),  # First one is primary
-                            confidence_score=group_data["confidence"]
-                        )
-                        entries.append(entry)
-                        self.db.add(entry)
-                    
-                    created_groups.append({
-                        "id": duplicate_group.id,
-                        "method": group_data["method"],
-                        "confidence": group_data["confidence"],
-                        "transaction_count": len(group_data["transaction_ids"]),
-                        "transactions": group_data["transaction_ids"]
-                    })
-                    
-                except Exception as e:
-                    # Skip this group if there's an error
-                    continue
+            # Create duplicate groups in database - one flush for all groups
+            # (their IDs are needed), then every entry in a single bulk INSERT
+            # instead of a flush and an add per group
+            new_groups = [
+                models.DuplicateGroup(
+                    detection_method=group_data["method"],
+                    confidence_score=group_data["confidence"],
+                    user_id=self.user_id,
+                    status=models.DuplicateStatus.PENDING
+                )
+                for group_data in all_duplicate_groups
+            ]
+            self.db.add_all(new_groups)
+            self.db.flush()  # Get IDs without committing
+            
+            entries = [
+                {
+                    "group_id": duplicate_group.id,
+                    "transaction_id": transaction_id,
+                    "is_primary": (i == 0),  # First one is primary
+                    "confidence_score": group_data["confidence"]
+                }
+                for duplicate_group, group_data in zip(new_groups, all_duplicate_groups)
+                for i, transaction_id in enumerate(group_data["transaction_ids"])
+            ]
+            if entries:
+                self.db.execute(insert(models.DuplicateEntry), entries)
+            
+            created_groups = [
+                {
+                    "id": duplicate_group.id,
+                    "method": group_data["method"],
+                    "confidence": group_data["confidence"],
+                    "transaction_count": len(group_data["transaction_ids"]),
+                    "transactions": group_data["transaction_ids"]
+                }
+                for duplicate_group, group_data in zip(new_groups, all_duplicate_groups)
+            ]
             
             self.db.commit()
             return created_groups
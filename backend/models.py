@@ -5,7 +5,7 @@ from sqlalchemy import (
     create_engine, Column, Integer, String, Date, Numeric, Boolean, JSON, 
     ForeignKey, DateTime, Text, Float, UniqueConstraint, Index, LargeBinary, Enum
 )
-from sqlalchemy.orm import relationship, sessionmaker
+from sqlalchemy.orm import relationship, sessionmaker, deferred
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from enum import Enum as PyEnum
@@ -13,7 +13,21 @@ import sqlalchemy as sa
 
 # Database Setup
 DATABASE_URL = "sqlite:///./database.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_engine(
+    DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    # Sized for the threadpool that sync handlers run in; LIFO keeps the
+    # most recently used connections warm
+    pool_size=20,
+    max_overflow=40,
+    pool_timeout=30,
+    pool_recycle=1800,
+    pool_pre_ping=True,
+    pool_use_lifo=True,
+    # Each optional filter combination on the listing endpoints compiles to
+    # its own cached statement - leave room for all of them
+    query_cache_size=1200
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -93,10 +107,10 @@ class RawFile(Base):
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
     original_filename = Column(String, nullable=False)
-    file_content = Column(LargeBinary, nullable=False)
+    file_content = deferred(Column(LargeBinary, nullable=False))  # Only loaded when accessed
     file_size = Column(Integer, nullable=False)
     file_type = Column(String, nullable=False)  # .csv, .xlsx, etc
-    content_hash = Column(String, nullable=False, unique=True)
+    content_hash = Column(LargeBinary(32), nullable=False)  # Raw SHA-256 digest
     
     # Classification
     detected_file_type = Column(Enum(FileType), default=FileType.UNKNOWN)
@@ -118,6 +132,11 @@ class RawFile(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user = relationship("User", back_populates="raw_files")
     processing_sessions = relationship("ProcessingSession", back_populates="raw_file")
+    
+    # Duplicate uploads are detected per user
+    __table_args__ = (
+        UniqueConstraint('user_id', 'content_hash', name='uq_raw_files_user_hash'),
+    )
 
 # ===== STAGE 2: PROCESSING =====
 
@@ -221,6 +240,11 @@ class Transaction(Base):
         Index('idx_transactions_date_owner', 'transaction_date', 'owner_id'),
         Index('idx_transactions_category_owner', 'category', 'owner_id'),
         Index('idx_transactions_amount', 'amount'),
+        Index('idx_transactions_owner_date_beneficiary', 'owner_id', 'transaction_date', 'beneficiary',
+              postgresql_include=['amount', 'category']),
+        Index('ix_txn_owner_cat_date', 'owner_id', 'category', transaction_date.desc()),
+        Index('ix_txn_owner_expense', 'owner_id', 'transaction_date',
+              sqlite_where=amount < 0, postgresql_where=amount < 0),
     )
 
 # ===== CATEGORIES =====
@@ -325,6 +349,14 @@ class DuplicateGroup(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user = relationship("User", back_populates="duplicate_groups")
     entries = relationship("DuplicateEntry", back_populates="group")
+    
+    # Backs keyset pagination of a user's groups, newest first, plus the
+    # per-user status breakdown and recent resolution counts
+    __table_args__ = (
+        Index('ix_dup_groups_user_created', 'user_id', created_at.desc(), id.desc()),
+        Index('ix_dup_groups_user_status', 'user_id', 'status'),
+        Index('ix_dup_groups_user_resolved', 'user_id', 'resolved_at'),
+    )
 
 class DuplicateEntry(Base):
     """Individual transactions within a duplicate group"""
@@ -342,6 +374,12 @@ class DuplicateEntry(Base):
     
     group = relationship("DuplicateGroup", back_populates="entries")
     transaction = relationship("Transaction")
+    
+    # Covering index for group lookups and the non-primary entry paths
+    __table_args__ = (
+        Index('ix_dup_entries_group_is_primary', 'group_id', 'is_primary',
+              postgresql_include=['transaction_id', 'confidence_score']),
+    )
 
 # ===== CREATE TABLES =====
 
@@ -349,10 +387,93 @@ def create_tables():
     """Create all database tables."""
     try:
         Base.metadata.create_all(bind=engine)
+        upgrade_raw_files()
+        create_missing_indexes()
         print("✅ Database tables created successfully")
     except Exception as e:
         print(f"❌ Error creating tables: {e}")
 
+def create_missing_indexes():
+    """Add indexes declared after a table was first created."""
+    # create_all skips tables that already exist, indexes included
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def upgrade_raw_files():
+    """Bring raw_files from older releases up to the current schema."""
+    _rebuild_raw_files_unique()
+    _convert_raw_file_hashes()
+
+def _rebuild_raw_files_unique():
+    """Replace the old global UNIQUE(content_hash) with the per-user one."""
+    inspector = sa.inspect(engine)
+    unique_columns = [
+        constraint["column_names"]
+        for constraint in inspector.get_unique_constraints(RawFile.__tablename__)
+    ]
+    if ["user_id", "content_hash"] in unique_columns:
+        return
+    
+    # SQLite can't drop the old UNIQUE(content_hash) in place - copy the rows
+    # into a table built from the current model and swap it in
+    table = RawFile.__table__
+    metadata = sa.MetaData()
+    User.__table__.to_metadata(metadata)  # Target of the user_id foreign key
+    new_table = table.to_metadata(metadata, name=f"{table.name}_new")
+    new_table.indexes.clear()
+    columns = ", ".join(column.name for column in table.columns)
+    
+    with engine.begin() as conn:
+        new_table.create(conn)
+        conn.exec_driver_sql(
+            f"INSERT INTO {new_table.name} ({columns}) SELECT {columns} FROM {table.name}"
+        )
+        conn.exec_driver_sql(f"DROP TABLE {table.name}")
+        conn.exec_driver_sql(f"ALTER TABLE {new_table.name} RENAME TO {table.name}")
+        for index in table.indexes:
+            index.create(conn)
+    
+    print("✅ raw_files upgraded to per-user duplicate detection")
+
+def _convert_raw_file_hashes():
+    """Rewrite content hashes stored as 64-char hex into raw 32-byte digests."""
+    table = RawFile.__table__
+    
+    with engine.begin() as conn:
+        hex_rows = conn.execute(
+            sa.select(
+                table.c.id, table.c.user_id, sa.cast(table.c.content_hash, String)
+            ).where(sa.func.length(table.c.content_hash) == 64)
+        ).all()
+        if not hex_rows:
+            return
+        
+        # A file uploaded both before and after the switch already has its
+        # digest stored - leave the older copy alone rather than break the
+        # (user_id, content_hash) constraint
+        seen = set(conn.execute(
+            sa.select(table.c.user_id, table.c.content_hash).where(
+                sa.func.length(table.c.content_hash) == 32
+            )
+        ).all())
+        
+        conversions = []
+        for row_id, user_id, hex_hash in hex_rows:
+            digest = bytes.fromhex(hex_hash)
+            if (user_id, digest) not in seen:
+                seen.add((user_id, digest))
+                conversions.append({"row_id": row_id, "digest": digest})
+        
+        if conversions:
+            conn.execute(
+                sa.update(table).where(table.c.id == sa.bindparam("row_id")).values(
+                    content_hash=sa.bindparam("digest")
+                ),
+                conversions
+            )
+            print(f"✅ Converted {len(conversions)} raw file hashes to binary digests")
+
 # ===== DEFAULT DATA CREATION =====
 
 async def create_default_categories(db, user_id: int):
@@ -372,14 +493,15 @@ async def create_default_categories(db, user_id: int):
     ]
     
     try:
+        # Load the user's existing category names once instead of checking
+        # each default separately
+        existing_names = {
+            name for (name,) in db.query(Category.name).filter(Category.user_id == user_id)
+        }
+        
         for cat_data in default_categories:
             # Check if category already exists
-            existing = db.query(Category).filter(
-                Category.user_id == user_id,
-                Category.name == cat_data["name"]
-            ).first()
-            
-            if not existing:
+            if cat_data["name"] not in existing_names:
                 category = Category(
                     name=cat_data["name"],
                     color=cat_data["color"],
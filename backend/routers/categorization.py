@@ -1,7 +1,7 @@
 # backend/routers/categorization.py
 # Fixed categorization router with proper imports
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, BackgroundTasks, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from typing import Dict, List, Optional, Any
@@ -9,7 +9,9 @@ from datetime import datetime
 import json
 
 from .. import models
+from ..cache import transaction_summary_cache
 from ..dependencies import get_current_user, get_db
+from ..responses import dumps
 
 # Try to import ML classes (graceful degradation if missing)
 try:
@@ -169,11 +171,29 @@ async def train_categorization_model(
             "timestamp": datetime.utcnow().isoformat()
         }
 
+async def _learn_from_correction(
+    user_id: int,
+    transaction_data: dict,
+    correct_category: str,
+    was_suggestion: bool
+):
+    """Apply categorization feedback after the response, with its own session."""
+    db = models.SessionLocal()
+    try:
+        ml_categorizer = MLCategorizer(user_id, db)
+        await ml_categorizer.learn_from_correction(
+            transaction_data, correct_category, was_suggestion
+        )
+    except Exception as e:
+        print(f"Categorization feedback failed for user {user_id}: {e}")
+    finally:
+        db.close()
+
 @router.post("/feedback/")
 async def provide_categorization_feedback(
     feedback_data: dict,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    current_user: models.User = Depends(get_current_user)
 ):
     """Provide feedback on ML categorization for learning."""
     
@@ -193,22 +213,17 @@ async def provide_categorization_feedback(
             "will_improve_suggestions": False
         }
     
-    try:
-        ml_categorizer = MLCategorizer(current_user.id, db)
-        await ml_categorizer.learn_from_correction(
-            transaction_data, correct_category, was_suggestion
-        )
-        
-        return {
-            "message": "Feedback recorded successfully",
-            "will_improve_suggestions": True
-        }
-    except Exception as e:
-        return {
-            "message": "Feedback recording failed",
-            "error": str(e),
-            "will_improve_suggestions": False
-        }
+    # Learning runs after the response is sent so the client never waits on
+    # the model update
+    background_tasks.add_task(
+        _learn_from_correction,
+        current_user.id, transaction_data, correct_category, was_suggestion
+    )
+    
+    return {
+        "message": "Feedback recorded successfully",
+        "will_improve_suggestions": True
+    }
 
 # ===== CATEGORY BOOTSTRAP =====
 
@@ -285,13 +300,15 @@ async def bulk_recategorize_transactions(
         )
     
     try:
-        # Update transactions
+        # Update transactions in one UPDATE; nothing in the session needs the
+        # new value, so skip evaluating it against loaded objects
         updated_count = db.query(models.Transaction).filter(
             models.Transaction.owner_id == current_user.id,
             models.Transaction.category == old_category
-        ).update({"category": new_category})
+        ).update({"category": new_category}, synchronize_session=False)
         
         db.commit()
+        transaction_summary_cache.delete_prefix(f"txn:summary:{current_user.id}:")
         
         return {
             "message": f"Recategorized {updated_count} transactions",
@@ -309,21 +326,29 @@ async def bulk_recategorize_transactions(
 
 # ===== DEBUG ENDPOINTS =====
 
+# Only depends on which optional modules imported, so it is built and
+# serialized once at import time
+_DEBUG_STATUS_JSON = dumps({
+    "ml_available": ML_AVAILABLE,
+    "bootstrap_available": BOOTSTRAP_AVAILABLE,
+    "features": {
+        "basic_categories": True,
+        "ml_training": ML_AVAILABLE,
+        "bootstrap_upload": BOOTSTRAP_AVAILABLE,
+        "bulk_operations": True
+    },
+    "recommendations": [
+        "Install scikit-learn for ML features" if not ML_AVAILABLE else "ML features ready",
+        "Complete CategoryBootstrap implementation" if not BOOTSTRAP_AVAILABLE else "Bootstrap features ready"
+    ]
+})
+
 @router.get("/debug/status")
 async def debug_categorization_status():
     """Debug endpoint to check categorization system status."""
     
-    return {
-        "ml_available": ML_AVAILABLE,
-        "bootstrap_available": BOOTSTRAP_AVAILABLE,
-        "features": {
-            "basic_categories": True,
-            "ml_training": ML_AVAILABLE,
-            "bootstrap_upload": BOOTSTRAP_AVAILABLE,
-            "bulk_operations": True
-        },
-        "recommendations": [
-            "Install scikit-learn for ML features" if not ML_AVAILABLE else "ML features ready",
-            "Complete CategoryBootstrap implementation" if not BOOTSTRAP_AVAILABLE else "Bootstrap features ready"
-        ]
-    }
\ No newline at end of file
+    return Response(
+        content=_DEBUG_STATUS_JSON,
+        media_type="application/json",
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
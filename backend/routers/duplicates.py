@@ -1,14 +1,17 @@
 # backend/routers/duplicates.py
 # Fixed duplicates router with proper imports and error handling
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import func, desc, case, tuple_, select, update, lambda_stmt
+from sqlalchemy.exc import SQLAlchemyError
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
 from .. import models
+from ..cache import duplicate_scan_cache, duplicate_stats_cache, transaction_summary_cache
 from ..dependencies import get_current_user, get_db
+from ..responses import ORJSONResponse
 
 # Try to import DuplicateDetector (graceful degradation if missing)
 try:
@@ -17,11 +20,20 @@ try:
 except ImportError:
     DUPLICATE_DETECTOR_AVAILABLE = False
 
+# Vectorized fallback scan with graceful degradation
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+
+# Checked once at import instead of probing the models inside each request
+HAS_DUP_MODELS = hasattr(models, "DuplicateGroup") and hasattr(models, "DuplicateEntry")
+
 router = APIRouter()
 
 # ===== DUPLICATE DETECTION =====
 
-@router.post("/scan/")
 async def scan_for_duplicates(
     force_rescan: bool = Query(False, description="Force rescan even if recent scan exists"),
     current_user: models.User = Depends(get_current_user),
@@ -29,122 +41,181 @@ async def scan_for_duplicates(
 ):
     """Scan for duplicate transactions using multiple detection methods."""
     
-    if not DUPLICATE_DETECTOR_AVAILABLE:
-        # Fallback: Basic duplicate detection without DuplicateDetector
-        try:
-            transactions = db.query(models.Transaction).filter(
-                models.Transaction.owner_id == current_user.id
-            ).all()
-            
-            # Simple duplicate detection: same amount + beneficiary + date within 3 days
-            potential_duplicates = []
-            seen_combinations = {}
-            
-            for txn in transactions:
-                # Create a key for similar transactions
-                date_key = txn.transaction_date.strftime("%Y-%m-%d")
-                key = f"{abs(float(txn.amount))}_{txn.beneficiary.lower().strip()}"
-                
-                if key in seen_combinations:
-                    # Check if dates are within 3 days
-                    existing_txn = seen_combinations[key]
-                    date_diff = abs((txn.transaction_date - existing_txn.transaction_date).days)
-                    
-                    if date_diff <= 3:
-                        potential_duplicates.append({
-                            "original": existing_txn,
-                            "duplicate": txn,
-                            "confidence": 0.8 if date_diff == 0 else 0.6
-                        })
-                else:
-                    seen_combinations[key] = txn
-            
-            groups_found = len(potential_duplicates)
-            total_duplicates = groups_found * 2 if groups_found > 0 else 0
-            
-            return {
-                "message": "Basic duplicate scan completed",
-                "groups_found": groups_found,
-                "total_duplicates": total_duplicates,
-                "scan_timestamp": datetime.utcnow().isoformat(),
-                "method": "basic_detection"
-            }
-            
-        except Exception as e:
-            return {
-                "message": "Duplicate scan failed",
-                "error": str(e),
-                "groups_found": 0,
-                "total_duplicates": 0
-            }
-    
-    # Full duplicate detection with DuplicateDetector
     try:
-        detector = DuplicateDetector(db)
+        detector = DuplicateDetector(current_user.id, db)
+        cache_key = f"dup:scan:{current_user.id}"
         
-        # Check if recent scan exists and force_rescan is False
+        # Check if recent scan exists and force_rescan is False - the cached
+        # summary answers without a round trip, the table is the fallback
+        # after a restart
         recent_scan_cutoff = datetime.utcnow() - timedelta(hours=1)
         
         if not force_rescan:
-            recent_scan = db.query(models.DuplicateGroup).filter(
+            cached_scan = duplicate_scan_cache.get(cache_key)
+            if cached_scan:
+                return {
+                    "message": "Recent scan found, use force_rescan=true to override",
+                    "groups_found": cached_scan["groups_found"],
+                    "total_duplicates": cached_scan["total_duplicates"],
+                    "last_scan": cached_scan["scan_timestamp"]
+                }
+            
+            # Existence probe on a single column - stops at the first matching
+            # index row and never builds an ORM object
+            recent_scan_at = db.query(models.DuplicateGroup.created_at).filter(
                 models.DuplicateGroup.user_id == current_user.id,
                 models.DuplicateGroup.created_at >= recent_scan_cutoff
-            ).first()
+            ).limit(1).scalar()
             
-            if recent_scan:
+            if recent_scan_at:
                 return {
                     "message": "Recent scan found, use force_rescan=true to override",
                     "groups_found": 0,
                     "total_duplicates": 0,
-                    "last_scan": recent_scan.created_at.isoformat()
+                    "last_scan": recent_scan_at.isoformat()
                 }
         
         # Run detection
-        scan_result = await detector.scan_user_transactions(current_user.id)
+        created_groups = await detector.find_all_duplicates()
         
-        return {
+        failed = [group for group in created_groups if "error" in group]
+        if failed:
+            raise Exception(failed[0]["error"])
+        
+        scan_result = {
             "message": "Duplicate scan completed",
-            "groups_found": scan_result.get("groups_created", 0),
-            "total_duplicates": scan_result.get("total_duplicates", 0),
+            "groups_found": len(created_groups),
+            "total_duplicates": sum(group["transaction_count"] for group in created_groups),
             "scan_timestamp": datetime.utcnow().isoformat(),
-            "detection_methods_used": scan_result.get("methods_used", [])
+            "detection_methods_used": sorted({group["method"] for group in created_groups})
         }
+        duplicate_scan_cache.set(cache_key, scan_result)
+        duplicate_stats_cache.delete(f"dup:stats:{current_user.id}")
+        
+        return scan_result
         
     except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Duplicate scan failed: {str(e)}")
+
+def _count_basic_duplicates_loop(transactions) -> int:
+    """Count transactions matching an earlier one on amount + beneficiary within 3 days."""
+    
+    # Simple duplicate detection: same amount + beneficiary + date within 3 days
+    potential_duplicates = []
+    seen_combinations = {}
+    
+    for txn in transactions:
+        # Create a key for similar transactions
+        key = f"{abs(float(txn.amount))}_{txn.beneficiary.lower().strip()}"
+        
+        if key in seen_combinations:
+            # Check if dates are within 3 days
+            existing_txn = seen_combinations[key]
+            date_diff = abs((txn.transaction_date - existing_txn.transaction_date).days)
+            
+            if date_diff <= 3:
+                potential_duplicates.append({
+                    "original": existing_txn,
+                    "duplicate": txn,
+                    "confidence": 0.8 if date_diff == 0 else 0.6
+                })
+        else:
+            seen_combinations[key] = txn
+    
+    return len(potential_duplicates)
+
+def _count_basic_duplicates_vectorized(transactions) -> int:
+    """Same matching rules as the loop, grouped and compared in pandas."""
+    
+    if not transactions:
+        return 0
+    
+    df = pd.DataFrame(transactions, columns=["id", "amount", "beneficiary", "transaction_date"])
+    df["key_amount"] = df["amount"].astype(float).abs()
+    df["key_beneficiary"] = df["beneficiary"].str.lower().str.strip()
+    df["transaction_date"] = pd.to_datetime(df["transaction_date"])
+    
+    # Every row is compared with the first row seen for its key
+    keys = ["key_amount", "key_beneficiary"]
+    first_dates = df.groupby(keys, sort=False)["transaction_date"].transform("first")
+    date_diff = (df["transaction_date"] - first_dates).dt.days.abs()
+    
+    return int(((date_diff <= 3) & df.duplicated(keys)).sum())
+
+# Chosen once at import time, like the scan endpoint below
+_count_basic_duplicates = (
+    _count_basic_duplicates_vectorized if PANDAS_AVAILABLE else _count_basic_duplicates_loop
+)
+
+def basic_scan_for_duplicates(
+    force_rescan: bool = Query(False, description="Force rescan even if recent scan exists"),
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Basic duplicate scan used when DuplicateDetector is not available."""
+    
+    try:
+        # Only the columns the matching rules need
+        transactions = db.query(
+            models.Transaction.id,
+            models.Transaction.amount,
+            models.Transaction.beneficiary,
+            models.Transaction.transaction_date
+        ).filter(
+            models.Transaction.owner_id == current_user.id
+        ).all()
+        
+        groups_found = _count_basic_duplicates(transactions)
+        total_duplicates = groups_found * 2 if groups_found > 0 else 0
+        
         return {
-            "message": "Duplicate scan failed",
-            "error": str(e),
-            "groups_found": 0,
-            "total_duplicates": 0
+            "message": "Basic duplicate scan completed",
+            "groups_found": groups_found,
+            "total_duplicates": total_duplicates,
+            "scan_timestamp": datetime.utcnow().isoformat(),
+            "method": "basic_detection"
         }
+        
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Duplicate scan failed: {str(e)}")
+
+# Pick the scan implementation once at import time instead of branching on
+# DUPLICATE_DETECTOR_AVAILABLE inside every request
+if DUPLICATE_DETECTOR_AVAILABLE:
+    router.post("/scan/")(scan_for_duplicates)
+else:
+    router.post("/scan/")(basic_scan_for_duplicates)
 
 # ===== DUPLICATE GROUPS =====
 
 @router.get("/")
-async def get_duplicate_groups(
+def get_duplicate_groups(
     limit: int = Query(50, ge=1, le=1000, description="Number of groups to return"),
     offset: int = Query(0, ge=0, description="Number of groups to skip"),
     status_filter: Optional[str] = Query(None, description="Filter by status: pending, resolved, ignored"),
+    cursor_created_at: Optional[datetime] = Query(None, description="Keyset cursor: created_at of the last group seen"),
+    cursor_id: Optional[int] = Query(None, description="Keyset cursor: id of the last group seen"),
+    include_total: bool = Query(False, description="Include the total group count"),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get duplicate transaction groups for the current user."""
     
+    if not HAS_DUP_MODELS:
+        return {
+            "duplicate_groups": [],
+            "total": 0,
+            "offset": offset,
+            "limit": limit,
+            "message": "Duplicate detection models not available"
+        }
+    
     try:
-        # Build base query - graceful handling if DuplicateGroup doesn't exist
-        try:
-            query = db.query(models.DuplicateGroup).filter(
-                models.DuplicateGroup.user_id == current_user.id
-            )
-        except Exception:
-            # DuplicateGroup model doesn't exist
-            return {
-                "duplicate_groups": [],
-                "total": 0,
-                "offset": offset,
-                "limit": limit,
-                "message": "Duplicate detection models not available"
-            }
+        query = db.query(models.DuplicateGroup).filter(
+            models.DuplicateGroup.user_id == current_user.id
+        )
         
         # Apply status filter if provided
         if status_filter:
@@ -154,73 +225,100 @@ async def get_duplicate_groups(
             except AttributeError:
                 pass  # Invalid status, ignore filter
         
-        # Get groups with pagination
-        groups = query.order_by(
-            models.DuplicateGroup.created_at.desc()
-        ).offset(offset).limit(limit).all()
+        # The total is opt-in; when asked for it rides along on every row as a
+        # window count instead of costing a separate COUNT(*) query
+        page_query = query
+        if include_total:
+            page_query = page_query.add_columns(func.count().over().label("total_count"))
+        
+        # Keyset pagination: continue after the cursor instead of skipping
+        # offset rows, so deep pages cost the same as the first one
+        page_query = page_query.options(
+            selectinload(models.DuplicateGroup.entries).selectinload(models.DuplicateEntry.transaction).load_only(
+                models.Transaction.id,
+                models.Transaction.transaction_date,
+                models.Transaction.beneficiary,
+                models.Transaction.amount,
+                models.Transaction.category
+            )
+        ).order_by(
+            models.DuplicateGroup.created_at.desc(),
+            models.DuplicateGroup.id.desc()
+        )
+        if cursor_created_at is not None and cursor_id is not None:
+            page_query = page_query.filter(
+                tuple_(models.DuplicateGroup.created_at, models.DuplicateGroup.id) < (cursor_created_at, cursor_id)
+            )
+        else:
+            page_query = page_query.offset(offset)
         
-        # Get total count
-        total = query.count()
+        # The page is capped by limit, so it is loaded here where database
+        # errors still reach the handler below
+        rows = page_query.limit(limit).all()
         
-        # Format response
         formatted_groups = []
-        for group in groups:
-            try:
-                # Get entries for this group
-                entries = db.query(models.DuplicateEntry).filter(
-                    models.DuplicateEntry.group_id == group.id
-                ).all()
+        total = 0
+        for row in rows:
+            if include_total:
+                group, total = row
+            else:
+                group = row
+            # Entries and their transactions are preloaded for the whole
+            # page, so there is no per-group query left to fail
+            transactions = []
+            for entry in group.entries:
+                transaction = entry.transaction
                 
-                # Get actual transaction details
-                transactions = []
-                for entry in entries:
-                    transaction = db.query(models.Transaction).filter(
-                        models.Transaction.id == entry.transaction_id
-                    ).first()
-                    
-                    if transaction:
-                        transactions.append({
-                            "id": transaction.id,
-                            "transaction_date": transaction.transaction_date.isoformat(),
-                            "beneficiary": transaction.beneficiary,
-                            "amount": float(transaction.amount),
-                            "category": transaction.category,
-                            "is_primary": entry.is_primary,
-                            "confidence": float(entry.confidence_score)
-                        })
-                
-                formatted_groups.append({
-                    "id": group.id,
-                    "detection_method": group.detection_method,
-                    "confidence_score": float(group.confidence_score),
-                    "status": group.status.value if hasattr(group.status, 'value') else str(group.status),
-                    "created_at": group.created_at.isoformat(),
-                    "resolved_at": group.resolved_at.isoformat() if group.resolved_at else None,
-                    "transaction_count": len(transactions),
-                    "transactions": transactions
-                })
-            except Exception as e:
-                # Skip problematic groups
-                continue
+                if transaction:
+                    transactions.append({
+                        "id": transaction.id,
+                        "transaction_date": transaction.transaction_date,
+                        "beneficiary": transaction.beneficiary,
+                        "amount": transaction.amount,
+                        "category": transaction.category,
+                        "is_primary": entry.is_primary,
+                        "confidence": entry.confidence_score
+                    })
+            
+            formatted_groups.append({
+                "id": group.id,
+                "detection_method": group.detection_method,
+                "confidence_score": group.confidence_score,
+                "status": group.status.value if hasattr(group.status, 'value') else str(group.status),
+                "created_at": group.created_at,
+                "resolved_at": group.resolved_at,
+                "transaction_count": len(transactions),
+                "transactions": transactions
+            })
+        
+        # Only a full page can have more groups after it
+        next_cursor = None
+        if len(rows) == limit:
+            last_group = rows[-1][0] if include_total else rows[-1]
+            next_cursor = {
+                "created_at": last_group.created_at,
+                "id": last_group.id
+            }
         
-        return {
+        page = {
             "duplicate_groups": formatted_groups,
-            "total": total,
             "offset": offset,
-            "limit": limit
+            "limit": limit,
+            "next_cursor": next_cursor
         }
+        if include_total:
+            page["total"] = total
+        else:
+            page["has_more"] = len(rows) == limit
+        
+        # Returned as a response object so FastAPI skips jsonable_encoder
+        return ORJSONResponse(content=page)
         
     except Exception as e:
-        return {
-            "duplicate_groups": [],
-            "total": 0,
-            "offset": offset,
-            "limit": limit,
-            "error": str(e)
-        }
+        raise HTTPException(status_code=500, detail=f"Error retrieving duplicate groups: {str(e)}")
 
 @router.get("/{group_id}")
-async def get_duplicate_group(
+def get_duplicate_group(
     group_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -228,24 +326,32 @@ async def get_duplicate_group(
     """Get details for a specific duplicate group."""
     
     try:
-        group = db.query(models.DuplicateGroup).filter(
-            models.DuplicateGroup.id == group_id,
-            models.DuplicateGroup.user_id == current_user.id
-        ).first()
+        # Lambda statement: the SQL is compiled once per process and only the
+        # bound ids change between calls
+        user_id = current_user.id
+        group = db.execute(lambda_stmt(
+            lambda: select(models.DuplicateGroup).options(
+                selectinload(models.DuplicateGroup.entries).selectinload(models.DuplicateEntry.transaction).load_only(
+                    models.Transaction.id,
+                    models.Transaction.transaction_date,
+                    models.Transaction.beneficiary,
+                    models.Transaction.amount,
+                    models.Transaction.category,
+                    models.Transaction.is_private
+                )
+            ).where(
+                models.DuplicateGroup.id == group_id,
+                models.DuplicateGroup.user_id == user_id
+            )
+        )).scalars().first()
         
         if not group:
             raise HTTPException(status_code=404, detail="Duplicate group not found")
         
-        # Get entries and transaction details
-        entries = db.query(models.DuplicateEntry).filter(
-            models.DuplicateEntry.group_id == group.id
-        ).all()
-        
+        # Entries and transaction details were loaded with the group
         transactions = []
-        for entry in entries:
-            transaction = db.query(models.Transaction).filter(
-                models.Transaction.id == entry.transaction_id
-            ).first()
+        for entry in group.entries:
+            transaction = entry.transaction
             
             if transaction:
                 transactions.append({
@@ -279,7 +385,7 @@ async def get_duplicate_group(
 # ===== DUPLICATE RESOLUTION =====
 
 @router.post("/{group_id}/resolve")
-async def resolve_duplicate_group(
+def resolve_duplicate_group(
     group_id: int,
     resolution_data: dict,
     current_user: models.User = Depends(get_current_user),
@@ -288,7 +394,9 @@ async def resolve_duplicate_group(
     """Resolve a duplicate group by keeping primary and removing duplicates."""
     
     try:
-        group = db.query(models.DuplicateGroup).filter(
+        group = db.query(models.DuplicateGroup).options(
+            selectinload(models.DuplicateGroup.entries)
+        ).filter(
             models.DuplicateGroup.id == group_id,
             models.DuplicateGroup.user_id == current_user.id
         ).first()
@@ -299,54 +407,71 @@ async def resolve_duplicate_group(
         action = resolution_data.get("action", "keep_primary")
         resolved_count = 0
         
-        # Get all entries in the group
-        entries = db.query(models.DuplicateEntry).filter(
-            models.DuplicateEntry.group_id == group.id
-        ).all()
+        # All entries in the group, loaded with the group
+        entries = group.entries
         
+        # Collect the transactions to remove for the chosen action
         if action == "delete_duplicates":
             # Delete all non-primary transactions
-            for entry in entries:
-                if not entry.is_primary:
-                    transaction = db.query(models.Transaction).filter(
-                        models.Transaction.id == entry.transaction_id
-                    ).first()
-                    
-                    if transaction:
-                        db.delete(transaction)
-                        resolved_count += 1
-        
+            target_ids = [entry.transaction_id for entry in entries if not entry.is_primary]
         elif action == "delete_all":
             # Delete all transactions in the group
-            for entry in entries:
-                transaction = db.query(models.Transaction).filter(
-                    models.Transaction.id == entry.transaction_id
-                ).first()
-                
-                if transaction:
-                    db.delete(transaction)
-                    resolved_count += 1
-        
+            target_ids = [entry.transaction_id for entry in entries]
         elif action == "keep_original":
             # Keep first transaction, delete others
-            for i, entry in enumerate(entries):
-                if i > 0:  # Keep first, delete rest
-                    transaction = db.query(models.Transaction).filter(
-                        models.Transaction.id == entry.transaction_id
-                    ).first()
-                    
-                    if transaction:
-                        db.delete(transaction)
-                        resolved_count += 1
-        
-        # Keep_all requires no action - just mark as resolved
-        
-        # Update group status
-        group.status = getattr(models.DuplicateStatus, 'RESOLVED', 'resolved')
-        group.resolved_at = datetime.utcnow()
-        group.resolution_action = action
+            target_ids = [entry.transaction_id for entry in entries[1:]]
+        elif action == "keep_primary":
+            # Re-mark the chosen primary with one CASE update instead of
+            # setting is_primary on every entry
+            primary_transaction_id = resolution_data.get("primary_transaction_id")
+            if primary_transaction_id is not None:
+                # Otherwise the CASE would clear every entry and leave the
+                # group resolved without a primary
+                if primary_transaction_id not in {entry.transaction_id for entry in entries}:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"Transaction {primary_transaction_id} is not in duplicate group {group_id}"
+                    )
+                
+                db.query(models.DuplicateEntry).filter(
+                    models.DuplicateEntry.group_id == group.id
+                ).update(
+                    {"is_primary": case(
+                        (models.DuplicateEntry.transaction_id == primary_transaction_id, True),
+                        else_=False
+                    )},
+                    synchronize_session=False
+                )
+            target_ids = []
+        else:
+            # Keep_all requires no action - just mark as resolved
+            target_ids = []
+        
+        # Single bulk DELETE scoped to the user's own transactions; the deleted
+        # rows are never touched again in this session, so skip synchronizing
+        # the identity map
+        if target_ids:
+            resolved_count = db.query(models.Transaction).filter(
+                models.Transaction.id.in_(target_ids),
+                models.Transaction.owner_id == current_user.id
+            ).delete(synchronize_session=False)
+        
+        # Update group status with a single UPDATE - committed together with
+        # the delete above
+        db.execute(
+            update(models.DuplicateGroup).where(
+                models.DuplicateGroup.id == group.id
+            ).values(
+                status=getattr(models.DuplicateStatus, 'RESOLVED', 'resolved'),
+                resolved_at=datetime.utcnow(),
+                resolution_action=action
+            ).execution_options(synchronize_session=False)
+        )
         
         db.commit()
+        duplicate_scan_cache.delete(f"dup:scan:{current_user.id}")
+        duplicate_stats_cache.delete(f"dup:stats:{current_user.id}")
+        transaction_summary_cache.delete_prefix(f"txn:summary:{current_user.id}:")
         
         return {
             "message": "Duplicate group resolved",
@@ -362,7 +487,7 @@ async def resolve_duplicate_group(
         raise HTTPException(status_code=500, detail=f"Resolution failed: {str(e)}")
 
 @router.post("/{group_id}/ignore")
-async def ignore_duplicate_group(
+def ignore_duplicate_group(
     group_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -370,19 +495,24 @@ async def ignore_duplicate_group(
     """Mark a duplicate group as ignored (false positive)."""
     
     try:
-        group = db.query(models.DuplicateGroup).filter(
-            models.DuplicateGroup.id == group_id,
-            models.DuplicateGroup.user_id == current_user.id
-        ).first()
-        
-        if not group:
+        # Ownership check and status change in one UPDATE ... RETURNING
+        ignored_id = db.execute(
+            update(models.DuplicateGroup).where(
+                models.DuplicateGroup.id == group_id,
+                models.DuplicateGroup.user_id == current_user.id
+            ).values(
+                status=getattr(models.DuplicateStatus, 'IGNORED', 'ignored'),
+                resolved_at=datetime.utcnow(),
+                resolution_action="ignored"
+            ).returning(models.DuplicateGroup.id)
+        ).scalar_one_or_none()
+        
+        if ignored_id is None:
             raise HTTPException(status_code=404, detail="Duplicate group not found")
         
-        group.status = getattr(models.DuplicateStatus, 'IGNORED', 'ignored')
-        group.resolved_at = datetime.utcnow()
-        group.resolution_action = "ignored"
-        
         db.commit()
+        duplicate_scan_cache.delete(f"dup:scan:{current_user.id}")
+        duplicate_stats_cache.delete(f"dup:stats:{current_user.id}")
         
         return {
             "message": "Duplicate group ignored",
@@ -398,87 +528,110 @@ async def ignore_duplicate_group(
 # ===== DUPLICATE STATISTICS =====
 
 @router.get("/stats/")
-async def get_duplicate_statistics(
+def get_duplicate_statistics(
+    response: Response,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get duplicate detection statistics for the user."""
     
     try:
-        # Get total duplicate groups by status
+        # Serve a recent result; resolve, ignore and scan invalidate it
+        cache_key = f"dup:stats:{current_user.id}"
+        cached_stats = duplicate_stats_cache.get(cache_key)
+        if cached_stats:
+            return cached_stats
+        
+        # The stats queries only vary by user, so they run as lambda
+        # statements whose compiled SQL is cached per process. A failed
+        # sub-query degrades its section and keeps the result out of the cache
+        user_id = current_user.id
+        degraded = False
+        resolved_status = getattr(models.DuplicateStatus, 'RESOLVED', 'resolved')
+        
+        # Get total duplicate groups by status; the window sum carries the
+        # grand total on every row so it comes back from the same scan
         try:
-            status_stats = db.query(
-                models.DuplicateGroup.status,
-                func.count(models.DuplicateGroup.id).label('count')
-            ).filter(
-                models.DuplicateGroup.user_id == current_user.id
-            ).group_by(models.DuplicateGroup.status).all()
-        except Exception:
+            status_stats = db.execute(lambda_stmt(
+                lambda: select(
+                    models.DuplicateGroup.status,
+                    func.count(models.DuplicateGroup.id).label('count'),
+                    func.sum(func.count(models.DuplicateGroup.id)).over().label('total')
+                ).where(
+                    models.DuplicateGroup.user_id == user_id
+                ).group_by(models.DuplicateGroup.status)
+            )).all()
+        except SQLAlchemyError:
+            db.rollback()
+            degraded = True
             status_stats = []
         
         # Get detection method breakdown
         try:
-            method_stats = db.query(
-                models.DuplicateGroup.detection_method,
-                func.count(models.DuplicateGroup.id).label('count')
-            ).filter(
-                models.DuplicateGroup.user_id == current_user.id
-            ).group_by(models.DuplicateGroup.detection_method).all()
-        except Exception:
+            method_stats = db.execute(lambda_stmt(
+                lambda: select(
+                    models.DuplicateGroup.detection_method,
+                    func.count(models.DuplicateGroup.id).label('count')
+                ).where(
+                    models.DuplicateGroup.user_id == user_id
+                ).group_by(models.DuplicateGroup.detection_method)
+            )).all()
+        except SQLAlchemyError:
+            db.rollback()
+            degraded = True
             method_stats = []
         
-        # Calculate potential savings
+        # Calculate potential savings in one aggregate over the non-primary
+        # entries of resolved groups. The outer join keeps entries whose
+        # transaction was already deleted in the duplicate count
         total_duplicate_entries = 0
         potential_savings = 0.0
         
         try:
-            resolved_groups = db.query(models.DuplicateGroup).filter(
-                models.DuplicateGroup.user_id == current_user.id,
-                models.DuplicateGroup.status == getattr(models.DuplicateStatus, 'RESOLVED', 'resolved')
-            ).all()
+            savings = db.execute(lambda_stmt(
+                lambda: select(
+                    func.count(models.DuplicateEntry.id).label('dup_count'),
+                    func.coalesce(func.sum(func.abs(models.Transaction.amount)), 0).label('savings')
+                ).join(
+                    models.DuplicateGroup, models.DuplicateGroup.id == models.DuplicateEntry.group_id
+                ).outerjoin(
+                    models.Transaction, models.Transaction.id == models.DuplicateEntry.transaction_id
+                ).where(
+                    models.DuplicateGroup.user_id == user_id,
+                    models.DuplicateGroup.status == resolved_status,
+                    models.DuplicateEntry.is_primary == False
+                )
+            )).one()
             
-            for group in resolved_groups:
-                try:
-                    entries = db.query(models.DuplicateEntry).filter(
-                        models.DuplicateEntry.group_id == group.id
-                    ).all()
-                    
-                    duplicate_count = len(entries) - 1  # Subtract 1 for the kept transaction
-                    total_duplicate_entries += duplicate_count
-                    
-                    # Calculate amount saved (sum of non-primary transactions)
-                    for entry in entries:
-                        if not entry.is_primary:
-                            transaction = db.query(models.Transaction).filter(
-                                models.Transaction.id == entry.transaction_id
-                            ).first()
-                            if transaction:
-                                potential_savings += abs(float(transaction.amount))
-                except Exception:
-                    continue
-        except Exception:
-            pass
-        
-        # Get recent activity (last 30 days)
-        recent_date = datetime.utcnow() - timedelta(days=30)
+            total_duplicate_entries = savings.dup_count
+            potential_savings = float(savings.savings)
+        except SQLAlchemyError:
+            db.rollback()
+            degraded = True
         
-        try:
-            recent_groups = db.query(func.count(models.DuplicateGroup.id)).filter(
-                models.DuplicateGroup.user_id == current_user.id,
-                models.DuplicateGroup.created_at >= recent_date
-            ).scalar() or 0
-        except Exception:
-            recent_groups = 0
+        # Get recent activity (last 30 days) - both counts from one pass
+        # over the user's groups with conditional aggregation. The window
+        # starts at midnight so the bound is the same all day
+        recent_date = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=30)
         
         try:
-            recent_resolutions = db.query(func.count(models.DuplicateGroup.id)).filter(
-                models.DuplicateGroup.user_id == current_user.id,
-                models.DuplicateGroup.resolved_at >= recent_date
-            ).scalar() or 0
-        except Exception:
+            recent = db.execute(lambda_stmt(
+                lambda: select(
+                    func.count(case((models.DuplicateGroup.created_at >= recent_date, 1))).label('groups'),
+                    func.count(case((models.DuplicateGroup.resolved_at >= recent_date, 1))).label('resolutions')
+                ).where(
+                    models.DuplicateGroup.user_id == user_id
+                )
+            )).one()
+            recent_groups = recent.groups
+            recent_resolutions = recent.resolutions
+        except SQLAlchemyError:
+            db.rollback()
+            degraded = True
+            recent_groups = 0
             recent_resolutions = 0
         
-        return {
+        stats = {
             "status_breakdown": [
                 {"status": stat.status.value if hasattr(stat.status, 'value') else str(stat.status), "count": stat.count}
                 for stat in status_stats
@@ -487,7 +640,7 @@ async def get_duplicate_statistics(
                 {"method": stat.detection_method, "count": stat.count}
                 for stat in method_stats
             ],
-            "total_groups": sum(stat.count for stat in status_stats),
+            "total_groups": status_stats[0].total if status_stats else 0,
             "total_duplicates_found": total_duplicate_entries,
             "potential_savings": potential_savings,
             "recent_activity": {
@@ -495,45 +648,45 @@ async def get_duplicate_statistics(
                 "groups_resolved_30d": recent_resolutions
             }
         }
+        if not degraded:
+            duplicate_stats_cache.set(cache_key, stats)
+        else:
+            response.headers["Cache-Control"] = "no-store"
+        
+        return stats
         
     except Exception as e:
-        return {
-            "status_breakdown": [],
-            "detection_methods": [],
-            "total_groups": 0,
-            "total_duplicates_found": 0,
-            "potential_savings": 0.0,
-            "recent_activity": {
-                "groups_found_30d": 0,
-                "groups_resolved_30d": 0
-            },
-            "error": str(e)
-        }
+        raise HTTPException(status_code=500, detail=f"Error computing duplicate statistics: {str(e)}")
 
 # ===== DEBUG ENDPOINTS =====
 
+# Static status payload, built once at import time
+_DEBUG_STATUS = {
+    "duplicate_detector_available": DUPLICATE_DETECTOR_AVAILABLE,
+    "features": {
+        "basic_scanning": True,  # Always available with fallback
+        "advanced_scanning": DUPLICATE_DETECTOR_AVAILABLE,
+        "group_management": True,
+        "statistics": True,
+        "resolution": True
+    },
+    "recommendations": [
+        "Install DuplicateDetector for advanced features" if not DUPLICATE_DETECTOR_AVAILABLE else "Full duplicate detection available"
+    ],
+    "endpoints_available": [
+        "/scan/ - Scan for duplicates",
+        "/ - Get duplicate groups",
+        "/{group_id} - Get group details", 
+        "/{group_id}/resolve - Resolve duplicates",
+        "/{group_id}/ignore - Ignore false positives",
+        "/stats/ - Get statistics"
+    ]
+}
+
 @router.get("/debug/status")
-async def debug_duplicate_detection_status():
+async def debug_duplicate_detection_status(response: Response):
     """Debug endpoint to check duplicate detection system status."""
     
-    return {
-        "duplicate_detector_available": DUPLICATE_DETECTOR_AVAILABLE,
-        "features": {
-            "basic_scanning": True,  # Always available with fallback
-            "advanced_scanning": DUPLICATE_DETECTOR_AVAILABLE,
-            "group_management": True,
-            "statistics": True,
-            "resolution": True
-        },
-        "recommendations": [
-            "Install DuplicateDetector for advanced features" if not DUPLICATE_DETECTOR_AVAILABLE else "Full duplicate detection available"
-        ],
-        "endpoints_available": [
-            "/scan/ - Scan for duplicates",
-            "/ - Get duplicate groups",
-            "/{group_id} - Get group details", 
-            "/{group_id}/resolve - Resolve duplicates",
-            "/{group_id}/ignore - Ignore false positives",
-            "/stats/ - Get statistics"
-        ]
-    }
\ No newline at end of file
+    # Static payload - safe for shared caches
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return _DEBUG_STATUS
@@ -1,22 +1,44 @@
 # backend/routers/transactions.py
 # Complete transactions management router
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_, or_
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import func, desc, and_, or_, case, select, update, delete, union_all, literal, literal_column, null
 from typing import Dict, List, Optional, Any
 from datetime import datetime, date, timedelta
 from decimal import Decimal
+import csv
+import io
 
 from .. import models
+from ..cache import transaction_summary_cache
 from ..dependencies import get_current_user, get_db, get_pagination_params
+from ..responses import ORJSONResponse, dumps
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # ===== TRANSACTION RETRIEVAL =====
 
+# Response columns shared by the list and detail endpoints; rows are read as
+# mappings so each one serializes straight from dict(row)
+TRANSACTION_COLUMNS = (
+    models.Transaction.id,
+    models.Transaction.transaction_date,
+    models.Transaction.beneficiary,
+    models.Transaction.amount,
+    models.Transaction.category,
+    models.Transaction.subcategory,
+    models.Transaction.labels,
+    models.Transaction.tags,
+    models.Transaction.notes,
+    models.Transaction.is_private,
+    models.Transaction.created_at,
+    models.Transaction.updated_at
+)
+
 @router.get("/")
-async def get_transactions(
+def get_transactions(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
     pagination: dict = Depends(get_pagination_params),
@@ -30,24 +52,21 @@ async def get_transactions(
     """Get user's confirmed transactions with filtering and pagination."""
     
     try:
-        # Build base query
-        query = db.query(models.Transaction).filter(
-            models.Transaction.owner_id == current_user.id
-        )
+        # Build filters
+        filters = [models.Transaction.owner_id == current_user.id]
         
-        # Apply filters
         if category:
-            query = query.filter(models.Transaction.category == category)
+            filters.append(models.Transaction.category == category)
         
         if start_date:
-            query = query.filter(models.Transaction.transaction_date >= start_date)
+            filters.append(models.Transaction.transaction_date >= start_date)
         
         if end_date:
-            query = query.filter(models.Transaction.transaction_date <= end_date)
+            filters.append(models.Transaction.transaction_date <= end_date)
         
         if search:
             search_term = f"%{search}%"
-            query = query.filter(
+            filters.append(
                 or_(
                     models.Transaction.beneficiary.ilike(search_term),
                     models.Transaction.notes.ilike(search_term)
@@ -55,39 +74,39 @@ async def get_transactions(
             )
         
         if min_amount is not None:
-            query = query.filter(models.Transaction.amount >= min_amount)
+            filters.append(models.Transaction.amount >= min_amount)
         
         if max_amount is not None:
-            query = query.filter(models.Transaction.amount <= max_amount)
-        
-        # Get total count before pagination
-        total = query.count()
-        
-        # Apply pagination and ordering
-        transactions = query.order_by(
-            models.Transaction.transaction_date.desc(),
-            models.Transaction.id.desc()
-        ).offset(pagination["offset"]).limit(pagination["limit"]).all()
-        
-        # Format response
-        formatted_transactions = []
-        for t in transactions:
-            formatted_transactions.append({
-                "id": t.id,
-                "transaction_date": t.transaction_date.isoformat(),
-                "beneficiary": t.beneficiary,
-                "amount": float(t.amount),
-                "category": t.category,
-                "subcategory": getattr(t, 'subcategory', None),
-                "labels": getattr(t, 'labels', []),
-                "tags": getattr(t, 'tags', []),
-                "notes": t.notes,
-                "is_private": getattr(t, 'is_private', False),
-                "created_at": t.created_at.isoformat() if hasattr(t, 'created_at') and t.created_at else None,
-                "updated_at": t.updated_at.isoformat() if hasattr(t, 'updated_at') and t.updated_at else None
-            })
+            filters.append(models.Transaction.amount <= max_amount)
+        
+        # Core select of just the response columns - rows come back as plain
+        # mappings without building ORM objects, and the response class
+        # encodes the dates and Decimal amounts. The total rides along as a
+        # window count, so page and count come back in one round trip
+        rows = db.execute(
+            select(
+                *TRANSACTION_COLUMNS,
+                func.count().over().label("total_count")
+            ).where(*filters).order_by(
+                models.Transaction.transaction_date.desc(),
+                models.Transaction.id.desc()
+            ).offset(pagination["offset"]).limit(pagination["limit"])
+        ).mappings()
+        
+        formatted_transactions = [dict(row) for row in rows]
+        
+        if formatted_transactions:
+            total = formatted_transactions[0]["total_count"]
+            for t in formatted_transactions:
+                del t["total_count"]
+        elif pagination["offset"] == 0:
+            total = 0
+        else:
+            # Page past the end - no row to carry the window count
+            total = db.scalar(select(func.count(models.Transaction.id)).where(*filters))
         
-        return {
+        # Returned as a response object so FastAPI skips jsonable_encoder
+        return ORJSONResponse(content={
             "transactions": formatted_transactions,
             "total": total,
             "offset": pagination["offset"],
@@ -100,7 +119,7 @@ async def get_transactions(
                 "min_amount": min_amount,
                 "max_amount": max_amount
             }
-        }
+        })
         
     except Exception as e:
         raise HTTPException(
@@ -109,40 +128,29 @@ async def get_transactions(
         )
 
 @router.get("/{transaction_id}")
-async def get_transaction(
+def get_transaction(
     transaction_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get a specific transaction by ID."""
     
-    transaction = db.query(models.Transaction).filter(
-        models.Transaction.id == transaction_id,
-        models.Transaction.owner_id == current_user.id
-    ).first()
+    transaction = db.execute(
+        select(*TRANSACTION_COLUMNS).where(
+            models.Transaction.id == transaction_id,
+            models.Transaction.owner_id == current_user.id
+        )
+    ).mappings().first()
     
     if not transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
     
-    return {
-        "id": transaction.id,
-        "transaction_date": transaction.transaction_date.isoformat(),
-        "beneficiary": transaction.beneficiary,
-        "amount": float(transaction.amount),
-        "category": transaction.category,
-        "subcategory": getattr(transaction, 'subcategory', None),
-        "labels": getattr(transaction, 'labels', []),
-        "tags": getattr(transaction, 'tags', []),
-        "notes": transaction.notes,
-        "is_private": getattr(transaction, 'is_private', False),
-        "created_at": transaction.created_at.isoformat() if hasattr(transaction, 'created_at') and transaction.created_at else None,
-        "updated_at": transaction.updated_at.isoformat() if hasattr(transaction, 'updated_at') and transaction.updated_at else None
-    }
+    return ORJSONResponse(content=dict(transaction))
 
 # ===== TRANSACTION CREATION =====
 
 @router.post("/")
-async def create_transaction(
+def create_transaction(
     transaction_data: dict,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -181,19 +189,20 @@ async def create_transaction(
         
         db.add(transaction)
         db.commit()
+        transaction_summary_cache.delete_prefix(f"txn:summary:{current_user.id}:")
         db.refresh(transaction)
         
-        return {
+        return ORJSONResponse(content={
             "id": transaction.id,
             "message": "Transaction created successfully",
             "transaction": {
                 "id": transaction.id,
-                "transaction_date": transaction.transaction_date.isoformat(),
+                "transaction_date": transaction.transaction_date,
                 "beneficiary": transaction.beneficiary,
-                "amount": float(transaction.amount),
+                "amount": transaction.amount,
                 "category": transaction.category
             }
-        }
+        })
         
     except Exception as e:
         raise HTTPException(
@@ -203,8 +212,11 @@ async def create_transaction(
 
 # ===== TRANSACTION UPDATES =====
 
+# Columns a client may not overwrite through PUT
+PROTECTED_FIELDS = {"id", "owner_id", "created_at", "updated_at"}
+
 @router.put("/{transaction_id}")
-async def update_transaction(
+def update_transaction(
     transaction_id: int,
     transaction_data: dict,
     current_user: models.User = Depends(get_current_user),
@@ -212,38 +224,45 @@ async def update_transaction(
 ):
     """Update an existing transaction."""
     
-    transaction = db.query(models.Transaction).filter(
-        models.Transaction.id == transaction_id,
-        models.Transaction.owner_id == current_user.id
-    ).first()
-    
-    if not transaction:
-        raise HTTPException(status_code=404, detail="Transaction not found")
-    
     try:
-        # Update fields
+        # Collect the column values to write
+        updatable_fields = set(models.Transaction.__table__.columns.keys()) - PROTECTED_FIELDS
+        values = {}
         for field, value in transaction_data.items():
             if field == "transaction_date" and isinstance(value, str):
                 value = datetime.fromisoformat(value).date()
             elif field == "amount":
                 value = Decimal(str(value))
             
-            if hasattr(transaction, field):
-                setattr(transaction, field, value)
+            if field in updatable_fields:
+                values[field] = value
+        
+        values["updated_at"] = datetime.utcnow()
         
-        # Update timestamp if available
-        if hasattr(transaction, 'updated_at'):
-            transaction.updated_at = datetime.utcnow()
+        # Ownership check and update in one UPDATE ... RETURNING
+        updated_id = db.execute(
+            update(models.Transaction).where(
+                models.Transaction.id == transaction_id,
+                models.Transaction.owner_id == current_user.id
+            ).values(**values).returning(models.Transaction.id)
+        ).scalar_one_or_none()
+        
+        if updated_id is None:
+            raise HTTPException(status_code=404, detail="Transaction not found")
         
         db.commit()
+        transaction_summary_cache.delete_prefix(f"txn:summary:{current_user.id}:")
         
         return {
-            "id": transaction.id,
+            "id": updated_id,
             "message": "Transaction updated successfully",
-            "updated_fields": list(transaction_data.keys())
+            "updated_fields": [field for field in transaction_data if field in updatable_fields]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update transaction: {str(e)}"
@@ -252,31 +271,37 @@ async def update_transaction(
 # ===== TRANSACTION DELETION =====
 
 @router.delete("/{transaction_id}")
-async def delete_transaction(
+def delete_transaction(
     transaction_id: int,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a transaction."""
     
-    transaction = db.query(models.Transaction).filter(
-        models.Transaction.id == transaction_id,
-        models.Transaction.owner_id == current_user.id
-    ).first()
-    
-    if not transaction:
-        raise HTTPException(status_code=404, detail="Transaction not found")
-    
     try:
-        db.delete(transaction)
+        # Ownership check and delete in one DELETE ... RETURNING
+        deleted_id = db.execute(
+            delete(models.Transaction).where(
+                models.Transaction.id == transaction_id,
+                models.Transaction.owner_id == current_user.id
+            ).returning(models.Transaction.id)
+        ).scalar_one_or_none()
+        
+        if deleted_id is None:
+            raise HTTPException(status_code=404, detail="Transaction not found")
+        
         db.commit()
+        transaction_summary_cache.delete_prefix(f"txn:summary:{current_user.id}:")
         
         return {
             "message": "Transaction deleted successfully",
             "transaction_id": transaction_id
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete transaction: {str(e)}"
@@ -285,7 +310,7 @@ async def delete_transaction(
 # ===== BULK OPERATIONS =====
 
 @router.post("/bulk-delete")
-async def bulk_delete_transactions(
+def bulk_delete_transactions(
     transaction_ids: List[int],
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -299,6 +324,7 @@ async def bulk_delete_transactions(
         ).delete(synchronize_session=False)
         
         db.commit()
+        transaction_summary_cache.delete_prefix(f"txn:summary:{current_user.id}:")
         
         return {
             "message": f"Deleted {deleted_count} transactions",
@@ -313,7 +339,7 @@ async def bulk_delete_transactions(
         )
 
 @router.post("/bulk-categorize")
-async def bulk_categorize_transactions(
+def bulk_categorize_transactions(
     categorize_data: dict,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -336,6 +362,7 @@ async def bulk_categorize_transactions(
         ).update({"category": new_category}, synchronize_session=False)
         
         db.commit()
+        transaction_summary_cache.delete_prefix(f"txn:summary:{current_user.id}:")
         
         return {
             "message": f"Updated {updated_count} transactions",
@@ -352,7 +379,7 @@ async def bulk_categorize_transactions(
 # ===== STATISTICS =====
 
 @router.get("/stats/summary")
-async def get_transaction_summary(
+def get_transaction_summary(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
     start_date: Optional[date] = Query(None),
@@ -361,67 +388,102 @@ async def get_transaction_summary(
     """Get transaction summary statistics."""
     
     try:
-        # Build base query
-        query = db.query(models.Transaction).filter(
-            models.Transaction.owner_id == current_user.id
-        )
+        # Serve a recent summary for the same range; every transaction
+        # write for this user drops these entries
+        cache_key = f"txn:summary:{current_user.id}:{start_date}:{end_date}"
+        cached_summary = transaction_summary_cache.get(cache_key)
+        if cached_summary is not None:
+            return Response(content=cached_summary, media_type="application/json")
         
-        # Apply date filters
+        owner_filter = models.Transaction.owner_id == current_user.id
+        
+        # Date filters only narrow the transaction count
+        date_filters = []
         if start_date:
-            query = query.filter(models.Transaction.transaction_date >= start_date)
+            date_filters.append(models.Transaction.transaction_date >= start_date)
         if end_date:
-            query = query.filter(models.Transaction.transaction_date <= end_date)
+            date_filters.append(models.Transaction.transaction_date <= end_date)
         
-        # Get basic stats
-        total_transactions = query.count()
-        total_amount = db.query(func.sum(models.Transaction.amount)).filter(
-            models.Transaction.owner_id == current_user.id
-        ).scalar() or 0
-        
-        # Category breakdown
-        category_stats = db.query(
-            models.Transaction.category,
-            func.count(models.Transaction.id).label('count'),
-            func.sum(models.Transaction.amount).label('total_amount')
-        ).filter(
-            models.Transaction.owner_id == current_user.id
-        ).group_by(models.Transaction.category).all()
-        
-        # Monthly breakdown (last 12 months)
+        # Monthly breakdown covers the last 12 months
         twelve_months_ago = datetime.utcnow().date() - timedelta(days=365)
-        monthly_stats = db.query(
-            func.strftime('%Y-%m', models.Transaction.transaction_date).label('month'),
-            func.count(models.Transaction.id).label('count'),
-            func.sum(models.Transaction.amount).label('total_amount')
-        ).filter(
-            models.Transaction.owner_id == current_user.id,
-            models.Transaction.transaction_date >= twelve_months_ago
-        ).group_by(func.strftime('%Y-%m', models.Transaction.transaction_date)).all()
+        month = func.strftime('%Y-%m', models.Transaction.transaction_date)
         
-        return {
+        # The count honours the date filters while the amount total does
+        # not, so both come from one pass with a conditional count
+        if date_filters:
+            transaction_count = func.count(case((and_(*date_filters), 1)))
+        else:
+            transaction_count = func.count(models.Transaction.id)
+        
+        # All aggregates in one UNION ALL round trip; "kind" tells the parts
+        # apart when the rows are split up below
+        summary_rows = db.execute(
+            union_all(
+                select(
+                    literal("totals").label("kind"),
+                    null().label("key"),
+                    transaction_count.label("count"),
+                    func.sum(models.Transaction.amount).label("total_amount")
+                ).where(owner_filter),
+                select(
+                    literal("category"),
+                    models.Transaction.category,
+                    func.count(models.Transaction.id),
+                    func.sum(models.Transaction.amount)
+                ).where(owner_filter).group_by(models.Transaction.category),
+                select(
+                    literal("month"),
+                    month,
+                    func.count(models.Transaction.id),
+                    func.sum(models.Transaction.amount)
+                ).where(
+                    owner_filter,
+                    models.Transaction.transaction_date >= twelve_months_ago
+                ).group_by(month)
+            ).order_by(literal_column("kind"), literal_column("key"))
+        ).all()
+        
+        total_transactions = 0
+        total_amount = Decimal(0)
+        category_stats = []
+        monthly_stats = []
+        for row in summary_rows:
+            if row.kind == "totals":
+                total_transactions = row.count
+                total_amount = row.total_amount or Decimal(0)
+            elif row.kind == "category":
+                category_stats.append(row)
+            else:
+                monthly_stats.append(row)
+        
+        # Decimal sums go straight to the serializer
+        summary = dumps({
             "total_transactions": total_transactions,
-            "total_amount": float(total_amount),
+            "total_amount": total_amount,
             "date_range": {
                 "start_date": start_date.isoformat() if start_date else None,
                 "end_date": end_date.isoformat() if end_date else None
             },
             "category_breakdown": [
                 {
-                    "category": stat.category or "Uncategorized",
+                    "category": stat.key or "Uncategorized",
                     "count": stat.count,
-                    "total_amount": float(stat.total_amount or 0)
+                    "total_amount": stat.total_amount or Decimal(0)
                 }
                 for stat in category_stats
             ],
             "monthly_breakdown": [
                 {
-                    "month": stat.month,
+                    "month": stat.key,
                     "count": stat.count,
-                    "total_amount": float(stat.total_amount or 0)
+                    "total_amount": stat.total_amount or Decimal(0)
                 }
                 for stat in monthly_stats
             ]
-        }
+        })
+        transaction_summary_cache.set(cache_key, summary)
+        
+        return Response(content=summary, media_type="application/json")
         
     except Exception as e:
         raise HTTPException(
@@ -431,43 +493,96 @@ async def get_transaction_summary(
 
 # ===== EXPORT =====
 
+EXPORT_BATCH_SIZE = 1000
+
+def _stream_partitions(stmt):
+    """Yield batches of rows from a session owned by the streaming body."""
+    # get_db closes the request session before a StreamingResponse body is
+    # sent, so the cursor must come from a session the generator closes itself
+    db = models.SessionLocal()
+    try:
+        rows = db.execute(
+            stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        ).mappings()
+        yield from rows.partitions()
+    finally:
+        db.close()
+
 @router.get("/export/csv")
-async def export_transactions_csv(
+def export_transactions_csv(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
     start_date: Optional[date] = Query(None),
-    end_date: Optional[date] = Query(None)
+    end_date: Optional[date] = Query(None),
+    format: str = Query("json", pattern="^(json|csv|ndjson)$", description="json, csv or ndjson")
 ):
-    """Export transactions as CSV."""
+    """Export transactions as CSV rows in JSON, or stream them as CSV or NDJSON."""
     
     try:
-        # Build query with filters
-        query = db.query(models.Transaction).filter(
-            models.Transaction.owner_id == current_user.id
-        )
+        # Build query with filters - only the exported columns, as plain rows
+        stmt = select(
+            models.Transaction.transaction_date,
+            models.Transaction.beneficiary,
+            models.Transaction.amount,
+            models.Transaction.category,
+            models.Transaction.notes
+        ).where(models.Transaction.owner_id == current_user.id)
         
         if start_date:
-            query = query.filter(models.Transaction.transaction_date >= start_date)
+            stmt = stmt.where(models.Transaction.transaction_date >= start_date)
         if end_date:
-            query = query.filter(models.Transaction.transaction_date <= end_date)
-        
-        transactions = query.order_by(models.Transaction.transaction_date.desc()).all()
+            stmt = stmt.where(models.Transaction.transaction_date <= end_date)
         
-        # Generate CSV content
+        stmt = stmt.order_by(models.Transaction.transaction_date.desc())
+        filename = f"transactions_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
         csv_headers = ["Date", "Beneficiary", "Amount", "Category", "Notes"]
-        csv_rows = []
         
-        for t in transactions:
-            csv_rows.append([
-                t.transaction_date.isoformat(),
-                t.beneficiary,
-                str(t.amount),
-                t.category or "",
-                t.notes or ""
-            ])
+        def csv_row(row) -> List[str]:
+            return [
+                row["transaction_date"].isoformat(),
+                row["beneficiary"],
+                str(row["amount"]),
+                row["category"] or "",
+                row["notes"] or ""
+            ]
         
-        return {
-            "filename": f"transactions_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv",
+        if format != "json":
+            # Stream in batches from the cursor so memory stays flat no matter
+            # how many rows are exported
+            if format == "ndjson":
+                def generate_ndjson():
+                    for partition in _stream_partitions(stmt):
+                        yield b"".join(dumps(dict(row)) + b"\n" for row in partition)
+                
+                return StreamingResponse(
+                    generate_ndjson(),
+                    media_type="application/x-ndjson",
+                    headers={"Content-Disposition": f'attachment; filename="{filename}.ndjson"'}
+                )
+            
+            def generate_csv():
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(csv_headers)
+                for partition in _stream_partitions(stmt):
+                    writer.writerows(csv_row(row) for row in partition)
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+                if buffer.tell():
+                    yield buffer.getvalue()
+            
+            return StreamingResponse(
+                generate_csv(),
+                media_type="text/csv",
+                headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'}
+            )
+        
+        # Generate CSV content
+        csv_rows = [csv_row(row) for row in db.execute(stmt).mappings()]
+        
+        return ORJSONResponse(content={
+            "filename": f"{filename}.csv",
             "headers": csv_headers,
             "rows": csv_rows,
             "total_transactions": len(csv_rows),
@@ -475,7 +590,7 @@ async def export_transactions_csv(
                 "start_date": start_date.isoformat() if start_date else None,
                 "end_date": end_date.isoformat() if end_date else None
             }
-        }
+        })
         
     except Exception as e:
         raise HTTPException(
@@ -486,7 +601,7 @@ async def export_transactions_csv(
 # ===== DEBUG ENDPOINTS =====
 
 @router.get("/debug/recent")
-async def debug_recent_transactions(
+def debug_recent_transactions(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db),
     limit: int = Query(10, description="Number of recent transactions to show")
@@ -494,23 +609,31 @@ async def debug_recent_transactions(
     """Debug endpoint to see recent transactions."""
     
     try:
-        transactions = db.query(models.Transaction).filter(
+        transactions = db.query(models.Transaction).options(
+            load_only(
+                models.Transaction.id,
+                models.Transaction.transaction_date,
+                models.Transaction.beneficiary,
+                models.Transaction.amount,
+                models.Transaction.category
+            )
+        ).filter(
             models.Transaction.owner_id == current_user.id
         ).order_by(models.Transaction.transaction_date.desc()).limit(limit).all()
         
-        return {
+        return ORJSONResponse(content={
             "recent_transactions": [
                 {
                     "id": t.id,
-                    "date": t.transaction_date.isoformat(),
+                    "date": t.transaction_date,
                     "beneficiary": t.beneficiary,
-                    "amount": float(t.amount),
+                    "amount": t.amount,
                     "category": t.category
                 }
                 for t in transactions
             ],
             "count": len(transactions)
-        }
+        })
         
     except Exception as e:
         return {
@@ -3,17 +3,25 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select, insert, update, delete, literal
+from sqlalchemy.exc import IntegrityError
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import json
 import hashlib
 
 from .. import models, auth
-from ..dependencies import get_current_user, get_db
+from ..cache import raw_file_cache, transaction_summary_cache
+from ..dependencies import get_current_user, get_db, get_pagination_params
+from ..responses import ORJSONResponse
 
 router = APIRouter()
 
+# Raw uploads are stored in the database - matches the 100MB limit the
+# frontend enforces
+MAX_FILE_SIZE = 100 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # Global WebSocket manager (set by main.py)
 websocket_manager = None
 
@@ -24,6 +32,28 @@ def set_websocket_manager(manager):
 
 # ===== STAGE 1: RAW FILE UPLOAD =====
 
+def _find_raw_file(db: Session, user_id: int, content_hash: bytes) -> Optional[Dict[str, Any]]:
+    """Return the user's earlier upload of this content, caching it if found."""
+    existing_file = db.query(
+        models.RawFile.id,
+        models.RawFile.original_filename,
+        models.RawFile.upload_date
+    ).filter(
+        models.RawFile.content_hash == content_hash,
+        models.RawFile.user_id == user_id
+    ).first()
+    
+    if existing_file is None:
+        return None
+    
+    existing_file = {
+        "file_id": existing_file.id,
+        "filename": existing_file.original_filename,
+        "upload_date": existing_file.upload_date.isoformat()
+    }
+    raw_file_cache.set((user_id, content_hash), existing_file)
+    return existing_file
+
 @router.post("/raw/")
 async def upload_raw_file(
     file: UploadFile = File(...),
@@ -49,56 +79,85 @@ async def upload_raw_file(
             detail=f"File type {file_extension} not supported. Allowed: {', '.join(allowed_extensions)}"
         )
     
-    # Read file content
+    # Read file content in chunks, hashing as it arrives for duplicate
+    # detection instead of in a second pass over the whole buffer
     try:
-        file_content = await file.read()
-        file_size = len(file_content)
+        hasher = hashlib.sha256(usedforsecurity=False)  # Dedup fingerprint only
+        buffer = bytearray()
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+            buffer.extend(chunk)
+            if len(buffer) > MAX_FILE_SIZE:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024 * 1024)}MB"
+                )
         
-        # Create content hash for duplicate detection
-        content_hash = hashlib.sha256(file_content).hexdigest()
+        file_size = len(buffer)
+        content_hash = hasher.digest()
         
-        # Check for duplicate files
-        existing_file = db.query(models.RawFile).filter(
-            models.RawFile.content_hash == content_hash,
-            models.RawFile.user_id == current_user.id
-        ).first()
+        # Check for duplicate files - recently seen uploads are answered
+        # from memory, everything else is looked up by the indexed hash
+        cache_key = (current_user.id, content_hash)
+        existing_file = raw_file_cache.get(cache_key)
+        
+        if existing_file is None:
+            existing_file = _find_raw_file(db, current_user.id, content_hash)
         
         if existing_file:
             return {
                 "message": "File already uploaded",
-                "file_id": existing_file.id,
-                "filename": existing_file.original_filename,
-                "upload_date": existing_file.upload_date.isoformat(),
+                **existing_file,
                 "duplicate": True
             }
         
         # Create raw file record
-        # Create raw file record
-        raw_file = models.RawFile(
-            filename=f"raw_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{file.filename}",
-            original_filename=file.filename,
-            file_content=file_content,
-            file_size=file_size,
-            file_type=file_extension,
-            content_hash=content_hash,
-            detected_file_type=models.FileType(file_type),  # ← FIXED
-            user_id=current_user.id
-        )
+        try:
+            raw_file = db.execute(
+                insert(models.RawFile).values(
+                    filename=f"raw_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{file.filename}",
+                    original_filename=file.filename,
+                    file_content=buffer,  # Bound as-is - no second copy of the upload
+                    file_size=file_size,
+                    file_type=file_extension,
+                    content_hash=content_hash,
+                    detected_file_type=models.FileType(file_type),
+                    user_id=current_user.id
+                ).returning(models.RawFile.id, models.RawFile.upload_date)
+            ).one()
+            db.commit()
+        except IntegrityError:
+            # A concurrent upload of the same content got in first - the
+            # (user_id, content_hash) constraint rejected this copy
+            db.rollback()
+            existing_file = _find_raw_file(db, current_user.id, content_hash)
+            if existing_file is None:
+                raise
+            
+            return {
+                "message": "File already uploaded",
+                **existing_file,
+                "duplicate": True
+            }
         
-        db.add(raw_file)
-        db.commit()
-        db.refresh(raw_file)
+        raw_file_cache.set(cache_key, {
+            "file_id": raw_file.id,
+            "filename": file.filename,
+            "upload_date": raw_file.upload_date.isoformat()
+        })
         
         return {
             "message": "File uploaded successfully",
             "file_id": raw_file.id,
-            "filename": raw_file.original_filename,
+            "filename": file.filename,
             "file_size": file_size,
             "file_type": file_extension,
             "upload_date": raw_file.upload_date.isoformat(),
             "duplicate": False
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -222,45 +281,64 @@ async def get_processing_status(
 
 # ===== STAGE 3: STAGED TRANSACTIONS (Review & Confirm) =====
 
+# Columns shown in the review list; rows are read as mappings so each one
+# serializes straight from dict(row)
+STAGED_TRANSACTION_COLUMNS = (
+    models.StagedTransaction.id,
+    models.StagedTransaction.transaction_date,
+    models.StagedTransaction.beneficiary,
+    models.StagedTransaction.amount,
+    models.StagedTransaction.suggested_category,
+    func.coalesce(models.StagedTransaction.confidence_score, 0).label("confidence_score"),
+    models.StagedTransaction.notes,
+    models.StagedTransaction.created_at
+)
+
 @router.get("/staged/")
 async def get_staged_transactions(
-    offset: int = 0,
-    limit: int = 50,
+    pagination: dict = Depends(get_pagination_params),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get staged transactions for review."""
     
-    # Get staged transactions
-    staged_transactions = db.query(models.StagedTransaction).filter(
-        models.StagedTransaction.user_id == current_user.id,
-        models.StagedTransaction.status == models.TransactionStatus.STAGED
-    ).offset(offset).limit(limit).all()
-    
-    # Get total count
-    total = db.query(func.count(models.StagedTransaction.id)).filter(
+    filters = [
         models.StagedTransaction.user_id == current_user.id,
         models.StagedTransaction.status == models.TransactionStatus.STAGED
-    ).scalar()
-    
-    return {
-        "staged_transactions": [
-            {
-                "id": t.id,
-                "transaction_date": t.transaction_date.isoformat(),
-                "beneficiary": t.beneficiary,
-                "amount": float(t.amount),
-                "suggested_category": t.suggested_category,
-                "confidence_score": float(t.confidence_score) if t.confidence_score else 0.0,
-                "notes": t.notes,
-                "created_at": t.created_at.isoformat()
-            }
-            for t in staged_transactions
-        ],
+    ]
+    
+    # Core select of the review columns in a stable order, so pages never
+    # overlap; the response class encodes the dates and Decimal amounts.
+    # The total rides along as a window count, so page and count come back
+    # in one round trip
+    rows = db.execute(
+        select(
+            *STAGED_TRANSACTION_COLUMNS,
+            func.count().over().label("total_count")
+        ).where(*filters).order_by(
+            models.StagedTransaction.created_at.desc(),
+            models.StagedTransaction.id.desc()
+        ).offset(pagination["offset"]).limit(pagination["limit"])
+    ).mappings()
+    
+    staged_transactions = [dict(row) for row in rows]
+    
+    if staged_transactions:
+        total = staged_transactions[0]["total_count"]
+        for t in staged_transactions:
+            del t["total_count"]
+    elif pagination["offset"] == 0:
+        total = 0
+    else:
+        # Page past the end - no row to carry the window count
+        total = db.scalar(select(func.count(models.StagedTransaction.id)).where(*filters))
+    
+    return ORJSONResponse(content={
+        "staged_transactions": staged_transactions,
         "total": total,
-        "offset": offset,
-        "limit": limit
-    }
+        "offset": pagination["offset"],
+        "limit": pagination["limit"]
+    })
 
 @router.post("/staged/{transaction_id}/approve")
 async def approve_staged_transaction(
@@ -297,12 +375,72 @@ async def approve_staged_transaction(
     staged.confirmed_at = datetime.utcnow()
     
     db.commit()
+    transaction_summary_cache.delete_prefix(f"txn:summary:{current_user.id}:")
     
     return {
         "message": "Transaction approved",
         "transaction_id": confirmed.id
     }
 
+@router.post("/staged/bulk-approve")
+async def bulk_approve_staged_transactions(
+    approve_data: dict,
+    current_user: models.User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Approve several staged transactions at once."""
+    
+    staged_ids = approve_data.get("staged_ids") or []
+    if not staged_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="staged_ids is required"
+        )
+    
+    filters = [
+        models.StagedTransaction.id.in_(staged_ids),
+        models.StagedTransaction.user_id == current_user.id,
+        models.StagedTransaction.status == models.TransactionStatus.STAGED
+    ]
+    
+    # Only approve confident suggestions when asked to
+    if approve_data.get("auto_approve_high_confidence"):
+        threshold = approve_data.get("confidence_threshold", 0.9)
+        filters.append(models.StagedTransaction.confidence_score >= threshold)
+    
+    # Copy the rows over with one INSERT ... SELECT and mark them confirmed
+    # with one UPDATE, instead of an ORM object and flush per transaction
+    db.execute(
+        insert(models.Transaction).from_select(
+            ["transaction_date", "beneficiary", "amount", "category", "notes", "owner_id"],
+            select(
+                models.StagedTransaction.transaction_date,
+                models.StagedTransaction.beneficiary,
+                models.StagedTransaction.amount,
+                models.StagedTransaction.suggested_category,
+                models.StagedTransaction.notes,
+                literal(current_user.id)
+            ).where(*filters)
+        )
+    )
+    
+    approved_count = db.execute(
+        update(models.StagedTransaction).where(*filters).values(
+            status=models.TransactionStatus.CONFIRMED,
+            confirmed_at=datetime.utcnow()
+        ),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+    
+    db.commit()
+    transaction_summary_cache.delete_prefix(f"txn:summary:{current_user.id}:")
+    
+    return {
+        "message": f"Approved {approved_count} transactions",
+        "approved_count": approved_count,
+        "skipped_count": len(set(staged_ids)) - approved_count
+    }
+
 @router.delete("/staged/{transaction_id}")
 async def delete_staged_transaction(
     transaction_id: int,
@@ -311,15 +449,17 @@ async def delete_staged_transaction(
 ):
     """Delete a staged transaction."""
     
-    staged = db.query(models.StagedTransaction).filter(
-        models.StagedTransaction.id == transaction_id,
-        models.StagedTransaction.user_id == current_user.id
-    ).first()
+    # Ownership check and delete in one DELETE ... RETURNING
+    deleted_id = db.execute(
+        delete(models.StagedTransaction).where(
+            models.StagedTransaction.id == transaction_id,
+            models.StagedTransaction.user_id == current_user.id
+        ).returning(models.StagedTransaction.id)
+    ).scalar_one_or_none()
     
-    if not staged:
+    if deleted_id is None:
         raise HTTPException(status_code=404, detail="Staged transaction not found")
     
-    db.delete(staged)
     db.commit()
     
     return {"message": "Staged transaction deleted"}
@@ -4,6 +4,8 @@
 import io
 import re
 import csv
+import codecs
+import itertools
 import asyncio
 import hashlib
 from datetime import datetime, date
@@ -27,6 +29,13 @@ try:
 except ImportError:
     EXCEL_AVAILABLE = False
 
+# Rust-based Excel reader - much faster than the default pandas engines
+try:
+    import python_calamine
+    CALAMINE_AVAILABLE = True
+except ImportError:
+    CALAMINE_AVAILABLE = False
+
 # For fuzzy matching
 try:
     from fuzzywuzzy import fuzz
@@ -38,6 +47,15 @@ from . import models
 from .ml_categorizer import MLCategorizer
 from .duplicate_detector import DuplicateDetector
 
+# Encoding detection converges well within this many bytes
+CHARDET_SAMPLE_SIZE = 64 * 1024
+
+# Enough leading text for csv.Sniffer to see several full rows
+CSV_SNIFF_SIZE = 8 * 1024
+
+# Rows parsed when only validating a file's structure
+VALIDATION_SAMPLE_ROWS = 5
+
 class ProgressTracker:
     """Enhanced real-time progress tracking via WebSocket."""
     
@@ -378,27 +396,39 @@ class StagedTransactionProcessor:
             
             return error_result
     
-    async def _process_file_content(self, content: bytes, filename: str, file_type: str) -> List[Dict]:
-        """Process file content based on type."""
+    async def _process_file_content(self, content: bytes, filename: str, file_type: str, max_rows: Optional[int] = None) -> List[Dict]:
+        """Process file content based on type, optionally only the first max_rows CSV rows."""
         if file_type == '.csv':
-            return await self._process_csv_file(content)
+            return await self._process_csv_file(content, max_rows)
         else:
             return await self._process_excel_file(content)
     
-    async def _process_csv_file(self, content: bytes) -> List[Dict]:
+    async def _process_csv_file(self, content: bytes, max_rows: Optional[int] = None) -> List[Dict]:
         """Enhanced CSV processing with encoding detection."""
         import chardet
         
-        # Detect encoding
-        detected = chardet.detect(content)
-        encoding = detected.get('encoding', 'utf-8')
+        # Detect encoding - a byte order mark settles it outright, otherwise
+        # chardet only needs a prefix of the file
+        if content.startswith(codecs.BOM_UTF8):
+            encoding = 'utf-8-sig'
+        elif content.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            encoding = 'utf-16'
+        else:
+            detected = chardet.detect(content[:CHARDET_SAMPLE_SIZE])
+            encoding = detected.get('encoding') or 'utf-8'
+            # An ASCII prefix says nothing about the rest of the file - read
+            # it as UTF-8, which is a superset, and let the fallbacks below
+            # catch a legacy encoding further in
+            if encoding.lower() == 'ascii':
+                encoding = 'utf-8'
         
         try:
             # Try detected encoding first
             text_content = content.decode(encoding)
         except UnicodeDecodeError:
-            # Fallback encodings
-            for fallback_encoding in ['utf-8', 'latin1', 'cp1252']:
+            # Fallback encodings - cp1252 before latin1, which accepts any
+            # byte and would turn '€' and other cp1252 symbols into controls
+            for fallback_encoding in ['utf-8', 'cp1252', 'latin1']:
                 try:
                     text_content = content.decode(fallback_encoding)
                     break
@@ -407,11 +437,20 @@ class StagedTransactionProcessor:
             else:
                 raise Exception("Could not decode file with any supported encoding")
         
-        # Parse CSV with multiple delimiter detection
-        for delimiter in [',', ';', '\t', '|']:
+        # Parse CSV with multiple delimiter detection - the sniffed delimiter
+        # goes first so a normal file is parsed exactly once
+        delimiters = [',', ';', '\t', '|']
+        try:
+            sniffed = csv.Sniffer().sniff(text_content[:CSV_SNIFF_SIZE], delimiters=''.join(delimiters))
+            delimiters.remove(sniffed.delimiter)
+            delimiters.insert(0, sniffed.delimiter)
+        except csv.Error:
+            pass
+        
+        for delimiter in delimiters:
             try:
                 reader = csv.DictReader(io.StringIO(text_content), delimiter=delimiter)
-                rows = list(reader)
+                rows = list(itertools.islice(reader, max_rows))
                 if len(rows) > 0 and len(rows[0]) > 1:  # Valid CSV should have multiple columns
                     return rows
             except Exception:
@@ -426,7 +465,11 @@ class StagedTransactionProcessor:
         
         try:
             # Read Excel file
-            excel_data = pd.read_excel(io.BytesIO(content), sheet_name=None)  # Read all sheets
+            excel_data = pd.read_excel(
+                io.BytesIO(content),
+                sheet_name=None,  # Read all sheets
+                engine='calamine' if CALAMINE_AVAILABLE else None
+            )
             
             # Find the sheet with the most data
             best_sheet = None
@@ -446,6 +489,40 @@ class StagedTransactionProcessor:
         except Exception as e:
             raise Exception(f"Excel processing failed: {str(e)}")
     
+    def _sample_xlsx_file(self, content: bytes, max_rows: int) -> Tuple[List[Dict], int]:
+        """Read the first rows of the largest sheet without loading the whole workbook."""
+        workbook = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        try:
+            # Pick the largest sheet; its row count doubles as the estimate
+            row_count, sheet = max(
+                ((self._sheet_row_count(ws), ws) for ws in workbook.worksheets),
+                key=lambda sized: sized[0]
+            )
+            rows = sheet.iter_rows(max_row=max_rows + 1, values_only=True)
+            
+            header = next(rows, None)
+            if header is None:
+                return [], 0
+            
+            columns = [
+                str(column) if column is not None else f"Unnamed: {i}"
+                for i, column in enumerate(header)
+            ]
+            sample = [dict(zip(columns, row)) for row in rows]
+            return sample, max(row_count - 1, 0)
+        finally:
+            workbook.close()
+    
+    @staticmethod
+    def _sheet_row_count(sheet) -> int:
+        """Row count of a read-only sheet, from its dimension record when present."""
+        if sheet.max_row is not None:
+            return sheet.max_row
+        
+        # Files written by non-Excel tools often leave out <dimension>, so
+        # max_row is None - count the rows rather than report an empty sheet
+        return sum(1 for _ in sheet.iter_rows(values_only=True))
+    
     def _detect_format(self, raw_data: List[Dict]) -> str:
         """Enhanced format detection with scoring."""
         if not raw_data:
@@ -648,8 +725,19 @@ class StagedTransactionProcessor:
         try:
             file_type = '.' + filename.split('.')[-1].lower()
             
-            # Process file
-            raw_data = await self._process_file_content(content, filename, file_type)
+            # Only the sample rows checked below are parsed where possible;
+            # the row count is estimated without reading every row
+            if file_type == '.xlsx' and EXCEL_AVAILABLE:
+                raw_data, estimated_rows = self._sample_xlsx_file(content, VALIDATION_SAMPLE_ROWS)
+            else:
+                raw_data = await self._process_file_content(
+                    content, filename, file_type, max_rows=VALIDATION_SAMPLE_ROWS
+                )
+                if file_type == '.csv':
+                    line_count = content.count(b'\n') + (0 if content.endswith(b'\n') else 1)
+                    estimated_rows = max(line_count - 1, 0)  # Minus the header
+                else:
+                    estimated_rows = len(raw_data)
             
             if not raw_data:
                 return {"valid": False, "error": "No data found in file"}
@@ -681,7 +769,7 @@ class StagedTransactionProcessor:
                 suggestions.append("Ensure file has a column with transaction amounts")
             
             # Test data quality on sample rows
-            sample_size = min(5, len(raw_data))
+            sample_size = min(VALIDATION_SAMPLE_ROWS, len(raw_data))
             for i in range(sample_size):
                 try:
                     self._normalize_single_transaction(raw_data[i], format_detected, i + 1)
@@ -691,7 +779,7 @@ class StagedTransactionProcessor:
             return {
                 "valid": len(issues) == 0,
                 "format_detected": format_detected,
-                "estimated_rows": len(raw_data),
+                "estimated_rows": estimated_rows,
                 "columns_found": columns,
                 "column_mapping": self._suggest_column_mapping(columns),
                 "issues": issues,
@@ -0,0 +1,104 @@
+# tests/test_duplicates.py
+# Duplicate group resolution against a throwaway database
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+class ResolveKeepPrimaryTests(unittest.TestCase):
+    """keep_primary must only accept a transaction from the group."""
+    
+    @classmethod
+    def setUpClass(cls):
+        # The engine points at ./database.db - run from a scratch directory so
+        # the committed database is never touched
+        cls._cwd = os.getcwd()
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        os.chdir(cls._tmpdir.name)
+        
+        from fastapi.testclient import TestClient
+        from backend.main import app
+        from backend import models
+        
+        cls.models = models
+        cls.client = TestClient(app)
+        
+        response = cls.client.post("/auth/register", json={"email": "dup@test.com", "password": "pw"})
+        cls.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.models.engine.dispose()
+        os.chdir(cls._cwd)
+        cls._tmpdir.cleanup()
+    
+    def setUp(self):
+        self.transaction_ids = [
+            self.client.post("/transactions/", headers=self.headers, json={
+                "transaction_date": "2024-01-01",
+                "beneficiary": "Cafe",
+                "amount": -10.5
+            }).json()["id"]
+            for _ in range(2)
+        ]
+        
+        db = self.models.SessionLocal()
+        try:
+            user = db.query(self.models.User).filter_by(email="dup@test.com").one()
+            group = self.models.DuplicateGroup(
+                detection_method="exact_match",
+                confidence_score=0.9,
+                user_id=user.id
+            )
+            db.add(group)
+            db.flush()
+            for i, transaction_id in enumerate(self.transaction_ids):
+                db.add(self.models.DuplicateEntry(
+                    group_id=group.id,
+                    transaction_id=transaction_id,
+                    is_primary=(i == 0),
+                    confidence_score=0.9
+                ))
+            db.commit()
+            self.group_id = group.id
+        finally:
+            db.close()
+    
+    def _group_state(self):
+        db = self.models.SessionLocal()
+        try:
+            group = db.get(self.models.DuplicateGroup, self.group_id)
+            primaries = {entry.transaction_id: entry.is_primary for entry in group.entries}
+            return group.status, primaries
+        finally:
+            db.close()
+    
+    def test_keep_primary_marks_chosen_transaction(self):
+        response = self.client.post(f"/duplicates/{self.group_id}/resolve", headers=self.headers, json={
+            "action": "keep_primary",
+            "primary_transaction_id": self.transaction_ids[1]
+        })
+        
+        self.assertEqual(response.status_code, 200)
+        group_status, primaries = self._group_state()
+        self.assertEqual(group_status, self.models.DuplicateStatus.RESOLVED)
+        self.assertEqual(primaries, {self.transaction_ids[0]: False, self.transaction_ids[1]: True})
+    
+    def test_keep_primary_rejects_transaction_outside_group(self):
+        response = self.client.post(f"/duplicates/{self.group_id}/resolve", headers=self.headers, json={
+            "action": "keep_primary",
+            "primary_transaction_id": max(self.transaction_ids) + 1000
+        })
+        
+        self.assertEqual(response.status_code, 400)
+        group_status, primaries = self._group_state()
+        self.assertEqual(group_status, self.models.DuplicateStatus.PENDING)
+        self.assertEqual(primaries, {self.transaction_ids[0]: True, self.transaction_ids[1]: False})
+
+if __name__ == "__main__":
+    unittest.main()